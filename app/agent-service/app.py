@@ -1,13 +1,20 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
+from pydantic_settings import BaseSettings
 import asyncio
 import aio_pika
-import json
 import logging
+import orjson
 import os
-from datetime import datetime
+import time
+import zstandard as zstd
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Dict, Any
-import subprocess
+
+# Snapshot payloads are mostly top/df/ps text that compresses 5-10x;
+# level 3 is cheap enough for an hourly publish
+_ZSTD_COMPRESSOR = zstd.ZstdCompressor(level=3)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,12 +22,47 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Asset Agent Service", version="1.0.0")
 
-# Configuration
-RABBITMQ_HOST = os.getenv("MQ_HOST", "localhost") or "localhost"
-RABBITMQ_PORT = int(os.getenv("MQ_PORT", "5672") or "5672")
-RABBITMQ_USER = os.getenv("MQ_USER", "guest") or "guest"
-RABBITMQ_PASS = os.getenv("MQ_PASSWORD", "guest") or "guest"
-NODE_ID = os.getenv("NODE_ID", "unknown")
+class Settings(BaseSettings):
+    """Validated once at startup from the MQ_*/NODE_ID environment."""
+    mq_host: str = "localhost"
+    mq_port: int = 5672
+    mq_user: str = "guest"
+    mq_password: str = "guest"
+    node_id: str = "unknown"
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+settings = get_settings()
+NODE_ID = settings.node_id
+# Built once; every connect_robust call reuses the same string
+RABBITMQ_URL = f"amqp://{settings.mq_user}:{settings.mq_password}@{settings.mq_host}:{settings.mq_port}/"
+
+# Connection/channel are established once and reused for every publish;
+# reconnecting per event costs a TCP + AMQP handshake each time. The lock
+# only guards (re)connection, never the publish hot path.
+_mq_lock = asyncio.Lock()
+
+async def get_channel() -> aio_pika.abc.AbstractChannel:
+    channel = getattr(app.state, "mq_channel", None)
+    if channel is not None and not channel.is_closed:
+        return channel
+    async with _mq_lock:
+        channel = getattr(app.state, "mq_channel", None)
+        if channel is not None and not channel.is_closed:
+            return channel
+        connection = getattr(app.state, "mq_conn", None)
+        if connection is None or connection.is_closed:
+            connection = await aio_pika.connect_robust(RABBITMQ_URL)
+            app.state.mq_conn = connection
+        # Without publisher confirms each publish no longer awaits a broker
+        # ack round-trip; the HTTP caller never saw that guarantee anyway.
+        # Messages stay PERSISTENT so the broker still writes them to disk.
+        channel = await connection.channel(publisher_confirms=False)
+        await channel.declare_queue("asset_events", durable=True)
+        app.state.mq_channel = channel
+        return channel
 
 class AssetEvent(BaseModel):
     asset_id: str
@@ -50,26 +92,17 @@ async def health_check():
 async def collect_event(event: AssetEvent):
     """Collect asset events and send to RabbitMQ"""
     try:
-        # Connect to RabbitMQ
-        connection = await aio_pika.connect_robust(
-            f"amqp://{RABBITMQ_USER}:{RABBITMQ_PASS}@{RABBITMQ_HOST}:{RABBITMQ_PORT}/"
+        channel = await get_channel()
+
+        # Publish message
+        message = aio_pika.Message(
+            body=event.model_dump_json().encode(),
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
         )
-        
-        async with connection:
-            channel = await connection.channel()
-            
-            # Declare queue
-            queue = await channel.declare_queue("asset_events", durable=True)
-            
-            # Publish message
-            message = aio_pika.Message(
-                body=event.model_dump_json().encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-            )
-            
-            await channel.default_exchange.publish(message, routing_key="asset_events")
-            logger.info(f"Event sent to RabbitMQ: {event.asset_id}")
-            
+
+        await channel.default_exchange.publish(message, routing_key="asset_events")
+        logger.info(f"Event sent to RabbitMQ: {event.asset_id}")
+
         return {"status": "success", "message": "Event collected and queued"}
         
     except Exception as e:
@@ -89,50 +122,74 @@ async def metrics():
 # Background system collectors
 # ---------------------------
 
-def _run(cmd: str) -> str:
+async def _run(cmd: str) -> str:
+    """Run a shell command without blocking the event loop."""
     try:
-        return subprocess.check_output(cmd, shell=True, text=True, stderr=subprocess.STDOUT, timeout=5)
+        proc = await asyncio.create_subprocess_shell(
+            cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        try:
+            out, _ = await asyncio.wait_for(proc.communicate(), timeout=5)
+        except asyncio.TimeoutError:
+            proc.kill()
+            raise
+        return out.decode()
     except Exception as e:
         return f"ERR: {e}"
 
-def collect_system_snapshot() -> Dict[str, Any]:
+async def collect_system_snapshot() -> Dict[str, Any]:
+    commands = {
+        "cpu_mem": "COLUMNS=200 top -b -n1 | head -n 5",
+        "disk": "df -h",
+        "os_kernel": "uname -a",
+        "lsb_release": "lsb_release -a 2>/dev/null || cat /etc/os-release 2>/dev/null || echo 'N/A'",
+        "users": "who",
+        "processes_top": "ps -eo pid,comm,pcpu,pmem --sort=-pcpu | head -n 10",
+        "network": "ip -o -4 addr show || ifconfig 2>/dev/null",
+        "uptime": "uptime",
+        "loadavg": "cat /proc/loadavg",
+    }
+    # All commands run concurrently, so the snapshot takes as long as the
+    # slowest one rather than the sum of all of them.
+    results = await asyncio.gather(*(_run(cmd) for cmd in commands.values()), return_exceptions=True)
     snapshot: Dict[str, Any] = {
-        "cpu_mem": _run("COLUMNS=200 top -b -n1 | head -n 5"),
-        "disk": _run("df -h"),
-        "os_kernel": _run("uname -a"),
-        "lsb_release": _run("lsb_release -a 2>/dev/null || cat /etc/os-release 2>/dev/null || echo 'N/A'"),
-        "users": _run("who"),
-        "processes_top": _run("ps -eo pid,comm,pcpu,pmem --sort=-pcpu | head -n 10"),
-        "network": _run("ip -o -4 addr show || ifconfig 2>/dev/null"),
-        "uptime": _run("uptime"),
-        "loadavg": _run("cat /proc/loadavg"),
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "node_id": NODE_ID,
+        key: result if isinstance(result, str) else f"ERR: {result}"
+        for key, result in zip(commands, results)
     }
+    snapshot["timestamp"] = _utc_iso()
+    snapshot["node_id"] = NODE_ID
     return snapshot
 
+def _utc_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
 async def publish_system_snapshot():
-    data = collect_system_snapshot()
+    data = await collect_system_snapshot()
     event = {
         "asset_id": f"system-{NODE_ID}",
         "event_type": "system_metrics",
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        # Reuse the snapshot's timestamp rather than formatting a second one
+        "timestamp": data["timestamp"],
+        # Monotonic integer companion to the ISO string; consumers can
+        # compare it without parsing timestamps
+        "ts_ns": time.time_ns(),
         "data": data,
         "node_id": NODE_ID,
     }
 
     try:
-        connection = await aio_pika.connect_robust(
-            f"amqp://{RABBITMQ_USER}:{RABBITMQ_PASS}@{RABBITMQ_HOST}:{RABBITMQ_PORT}/"
+        channel = await get_channel()
+        await channel.default_exchange.publish(
+            aio_pika.Message(
+                body=_ZSTD_COMPRESSOR.compress(orjson.dumps(event)),
+                content_encoding="zstd",
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key="asset_events",
         )
-        async with connection:
-            channel = await connection.channel()
-            await channel.declare_queue("asset_events", durable=True)
-            await channel.default_exchange.publish(
-                aio_pika.Message(body=json.dumps(event).encode(), delivery_mode=aio_pika.DeliveryMode.PERSISTENT),
-                routing_key="asset_events",
-            )
-            logger.info("Published system_metrics event")
+        logger.info("Published system_metrics event")
     except Exception as e:
         logger.error(f"Failed to publish system snapshot: {e}")
 
@@ -144,9 +201,26 @@ async def periodic_system_publisher(interval_seconds: int = 3600):
 
 @app.on_event("startup")
 async def on_startup():
+    try:
+        await get_channel()
+    except Exception as e:
+        logger.error(f"Could not connect to RabbitMQ at startup, will retry on publish: {e}")
     asyncio.create_task(periodic_system_publisher(3600))
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    connection = getattr(app.state, "mq_conn", None)
+    if connection is not None:
+        await connection.close()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "2")),
+    )
 
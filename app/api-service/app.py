@@ -1,24 +1,47 @@
-from fastapi import FastAPI, HTTPException, Depends
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
+from pydantic_settings import BaseSettings
+from starlette.background import BackgroundTask
 import httpx
 import logging
 import os
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, Optional
 
-# Configure logging
+# Configure logging; stdout only, the platform captures it. A file handler
+# here would fsync on every record.
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('api_service.log')
-    ]
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Asset API Service", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Single long-lived client shared by every endpoint; opening a client per
+    # request costs a TCP handshake and a fresh connection pool each time.
+    # HTTP/2 lets the fan-out to processor/collector multiplex over one
+    # kept-alive connection per host.
+    app.state.http = httpx.AsyncClient(
+        timeout=10.0,
+        http2=True,
+        limits=httpx.Limits(
+            max_keepalive_connections=100,
+            max_connections=200,
+            keepalive_expiry=30.0,
+        ),
+    )
+    yield
+    await app.state.http.aclose()
+
+app = FastAPI(title="Asset API Service", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -29,10 +52,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress the large /assets and /events list responses; small payloads
+# and CORS preflights pass through untouched
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Configuration
 # Use service names for container-to-container communication
-PROCESSOR_SERVICE_URL = os.getenv("PROCESSOR_SERVICE_URL", "http://processor-service:8000")
-COLLECTOR_SERVICE_URL = os.getenv("COLLECTOR_SERVICE_URL", "http://collector-service:8000")
+class Settings(BaseSettings):
+    processor_service_url: str = "http://processor-service:8000"
+    collector_service_url: str = "http://collector-service:8000"
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
 
 def normalize_url(url: str, fallback: str) -> str:
     try:
@@ -45,8 +77,9 @@ def normalize_url(url: str, fallback: str) -> str:
     except Exception:
         return fallback
 
-PROCESSOR_SERVICE_URL = normalize_url(PROCESSOR_SERVICE_URL, "http://127.0.0.1:8001")
-COLLECTOR_SERVICE_URL = normalize_url(COLLECTOR_SERVICE_URL, "http://127.0.0.1:8002")
+settings = get_settings()
+PROCESSOR_SERVICE_URL = normalize_url(settings.processor_service_url, "http://127.0.0.1:8001")
+COLLECTOR_SERVICE_URL = normalize_url(settings.collector_service_url, "http://127.0.0.1:8002")
 
 class Asset(BaseModel):
     id: str
@@ -83,22 +116,19 @@ async def root():
 async def health_check():
     """Health check with downstream service status"""
     services = {}
-    
-    # Check processor service
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{PROCESSOR_SERVICE_URL}/healthz", timeout=5.0)
-            services["processor"] = "healthy" if response.status_code == 200 else "unhealthy"
-    except Exception as e:
-        services["processor"] = "unreachable"
-    
-    # Check collector service
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{COLLECTOR_SERVICE_URL}/healthz", timeout=5.0)
-            services["collector"] = "healthy" if response.status_code == 200 else "unhealthy"
-    except Exception as e:
-        services["collector"] = "unreachable"
+    client = app.state.http
+
+    async def probe(name: str, base_url: str):
+        try:
+            response = await client.get(f"{base_url}/healthz", timeout=5.0)
+            services[name] = "healthy" if response.status_code == 200 else "unhealthy"
+        except Exception:
+            services[name] = "unreachable"
+
+    # Probe both downstreams concurrently; each task handles its own errors
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(probe("processor", PROCESSOR_SERVICE_URL))
+        tg.create_task(probe("collector", COLLECTOR_SERVICE_URL))
     
     return HealthResponse(
         status="healthy",
@@ -106,65 +136,62 @@ async def health_check():
         services=services
     )
 
-@app.get("/assets", response_model=List[Asset])
+@app.get("/assets")
 async def get_assets(
-    skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     asset_type: Optional[str] = None,
     status: Optional[str] = None
 ):
-    """Get assets with optional filtering"""
+    """Get assets with optional filtering (streamed through from processor).
+    Pass the last row's last_updated and id joined by "|" as `cursor` for
+    the next page."""
     try:
-        print(f"[DEBUG] Fetching assets from {PROCESSOR_SERVICE_URL}/assets")
-        print(f"[DEBUG] Params: skip={skip}, limit={limit}, asset_type={asset_type}, status={status}")
-        
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            params = {"skip": skip, "limit": limit}
-            if asset_type:
-                params["asset_type"] = asset_type
-            if status:
-                params["status"] = status
-            
-            print(f"[DEBUG] Sending request to processor service...")
-            response = await client.get(
-                f"{PROCESSOR_SERVICE_URL}/assets",
-                params=params,
-                headers={"Content-Type": "application/json"}
-            )
-            
-            print(f"[DEBUG] Response status: {response.status_code}")
-            print(f"[DEBUG] Response headers: {dict(response.headers)}")
-            
+        client = app.state.http
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        if asset_type:
+            params["asset_type"] = asset_type
+        if status:
+            params["status"] = status
+
+        logger.debug("Fetching assets from processor, params=%s", params)
+        # Stream the processor's bytes straight through instead of decoding
+        # the JSON here only for FastAPI to re-encode it
+        req = client.build_request("GET", f"{PROCESSOR_SERVICE_URL}/assets", params=params)
+        response = await client.send(req, stream=True)
+        if response.status_code >= 400:
+            await response.aread()
+            await response.aclose()
             response.raise_for_status()
-            
-            data = response.json()
-            print(f"[DEBUG] Received data: {data}")
-            return data
-            
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            media_type="application/json",
+            background=BackgroundTask(response.aclose),
+        )
+
     except httpx.HTTPStatusError as e:
         error_msg = f"HTTP error from processor service: {str(e)}"
-        print(f"[ERROR] {error_msg}")
-        print(f"[ERROR] Response content: {e.response.text if hasattr(e, 'response') else 'No response'}")
+        logger.error("%s; response content: %s", error_msg, e.response.text if hasattr(e, 'response') else 'No response')
         raise HTTPException(status_code=e.response.status_code, detail=error_msg)
     except httpx.RequestError as e:
         error_msg = f"Request to processor service failed: {str(e)}"
-        print(f"[ERROR] {error_msg}")
+        logger.error(error_msg)
         raise HTTPException(status_code=503, detail=error_msg)
     except Exception as e:
         error_msg = f"Unexpected error: {str(e)}"
-        print(f"[ERROR] {error_msg}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        logger.error(error_msg, exc_info=True)
         raise HTTPException(status_code=500, detail=error_msg)
 
-@app.get("/assets/{asset_id}", response_model=Asset)
+@app.get("/assets/{asset_id}")
 async def get_asset(asset_id: str):
     """Get a specific asset by ID"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{PROCESSOR_SERVICE_URL}/assets/{asset_id}")
-            response.raise_for_status()
-            return response.json()
+        response = await app.state.http.get(f"{PROCESSOR_SERVICE_URL}/assets/{asset_id}")
+        response.raise_for_status()
+        return Response(content=response.content, media_type="application/json")
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(status_code=404, detail="Asset not found")
@@ -173,31 +200,22 @@ async def get_asset(asset_id: str):
         logger.error(f"Error fetching asset {asset_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.post("/assets", response_model=Asset)
+@app.post("/assets")
 async def create_asset(asset: AssetCreate):
     """Create a new asset"""
-    logger.debug(f"[POST /assets] Creating new asset: {asset.dict()}")
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            logger.debug(f"[POST /assets] Sending request to {PROCESSOR_SERVICE_URL}/assets")
-            logger.debug(f"[POST /assets] Request payload: {asset.dict()}")
-            
-            response = await client.post(
-                f"{PROCESSOR_SERVICE_URL}/assets",
-                json=asset.dict(),
-                headers={"Content-Type": "application/json"},
-                timeout=30.0
-            )
-            
-            logger.debug(f"[POST /assets] Response status: {response.status_code}")
-            logger.debug(f"[POST /assets] Response headers: {dict(response.headers)}")
-            
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.debug(f"[POST /assets] Created asset: {data}")
-            return data
-            
+        client = app.state.http
+        logger.debug("[POST /assets] Forwarding to %s/assets", PROCESSOR_SERVICE_URL)
+
+        response = await client.post(
+            f"{PROCESSOR_SERVICE_URL}/assets",
+            json=asset.dict(),
+            headers={"Content-Type": "application/json"},
+            timeout=30.0
+        )
+        response.raise_for_status()
+        return Response(content=response.content, media_type="application/json")
+
     except httpx.HTTPStatusError as e:
         error_detail = str(e)
         if hasattr(e, 'response') and e.response:
@@ -217,14 +235,13 @@ async def create_asset(asset: AssetCreate):
         logger.error(f"[POST /assets] Unexpected error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@app.put("/assets/{asset_id}", response_model=Asset)
+@app.put("/assets/{asset_id}")
 async def update_asset(asset_id: str, asset: AssetUpdate):
     """Update an existing asset"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.put(f"{PROCESSOR_SERVICE_URL}/assets/{asset_id}", json=asset.dict(exclude_unset=True))
-            response.raise_for_status()
-            return response.json()
+        response = await app.state.http.put(f"{PROCESSOR_SERVICE_URL}/assets/{asset_id}", json=asset.dict(exclude_unset=True))
+        response.raise_for_status()
+        return Response(content=response.content, media_type="application/json")
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(status_code=404, detail="Asset not found")
@@ -237,10 +254,9 @@ async def update_asset(asset_id: str, asset: AssetUpdate):
 async def delete_asset(asset_id: str):
     """Delete an asset"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(f"{PROCESSOR_SERVICE_URL}/assets/{asset_id}")
-            response.raise_for_status()
-            return {"message": "Asset deleted successfully"}
+        response = await app.state.http.delete(f"{PROCESSOR_SERVICE_URL}/assets/{asset_id}")
+        response.raise_for_status()
+        return {"message": "Asset deleted successfully"}
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(status_code=404, detail="Asset not found")
@@ -253,16 +269,16 @@ async def delete_asset(asset_id: str):
 async def get_events(limit: int = 100):
     """Get recent events from collector service"""
     try:
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{COLLECTOR_SERVICE_URL}/events", params={"limit": limit})
-                response.raise_for_status()
-                return response.json()
-            except Exception:
-                # Fallback to localhost collector
-                response = await client.get("http://127.0.0.1:8002/events", params={"limit": limit})
-                response.raise_for_status()
-                return response.json()
+        client = app.state.http
+        try:
+            response = await client.get(f"{COLLECTOR_SERVICE_URL}/events", params={"limit": limit})
+            response.raise_for_status()
+            return Response(content=response.content, media_type="application/json")
+        except Exception:
+            # Fallback to localhost collector
+            response = await client.get("http://127.0.0.1:8002/events", params={"limit": limit})
+            response.raise_for_status()
+            return Response(content=response.content, media_type="application/json")
     except Exception as e:
         # Fallback to empty list to keep UI functional when collector is down/unreachable
         logger.warning(f"Collector unreachable, returning empty events list. Error: {e}")
@@ -279,26 +295,35 @@ async def get_stats():
     total_assets = 0
     active_assets = 0
 
-    try:
-        async with httpx.AsyncClient() as client:
-            # Collector stats (optional)
-            try:
-                c_resp = await client.get(f"{COLLECTOR_SERVICE_URL}/stats")
-                c_resp.raise_for_status()
-                collector_stats = c_resp.json()
-            except Exception as e:
-                logger.warning(f"Collector stats unavailable, using defaults. Error: {e}")
+    client = app.state.http
 
-            # Processor assets for asset counts
-            try:
-                p_resp = await client.get(f"{PROCESSOR_SERVICE_URL}/assets")
-                p_resp.raise_for_status()
-                assets = p_resp.json()
-                total_assets = len(assets)
-                active_assets = sum(1 for a in assets if str(a.get("status", "")).lower() == "active")
-            except Exception as e:
-                logger.warning(f"Processor assets unavailable, counts set to 0. Error: {e}")
+    async def fetch_collector_stats():
+        nonlocal collector_stats
+        try:
+            c_resp = await client.get(f"{COLLECTOR_SERVICE_URL}/stats")
+            c_resp.raise_for_status()
+            collector_stats = c_resp.json()
+        except Exception as e:
+            logger.warning(f"Collector stats unavailable, using defaults. Error: {e}")
 
+    async def fetch_asset_counts():
+        nonlocal total_assets, active_assets
+        try:
+            # The processor counts in SQL; len() over GET /assets only saw
+            # the first page once that endpoint grew a default limit
+            p_resp = await client.get(f"{PROCESSOR_SERVICE_URL}/stats")
+            p_resp.raise_for_status()
+            counts = p_resp.json()
+            total_assets = int(counts.get("total_assets", 0))
+            active_assets = int(counts.get("active_assets", 0))
+        except Exception as e:
+            logger.warning(f"Processor stats unavailable, counts set to 0. Error: {e}")
+
+    try:
+        # Both downstreams are independent; fetch them concurrently
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(fetch_collector_stats())
+            tg.create_task(fetch_asset_counts())
     except Exception as e:
         logger.error(f"Error building stats: {e}")
 
@@ -312,37 +337,39 @@ async def get_stats():
 async def get_system_metrics():
     """Return a parsed summary of the latest system_metrics event from collector."""
     try:
-        async with httpx.AsyncClient() as client:
-            try:
-                resp = await client.get(f"{COLLECTOR_SERVICE_URL}/events", params={"limit": 100})
-                resp.raise_for_status()
-            except Exception:
-                resp = await client.get("http://127.0.0.1:8002/events", params={"limit": 100})
+        client = app.state.http
+        # Ask collector to pre-filter so only relevant events cross the wire
+        params = {"limit": 100, "event_type": "system_metrics"}
+        try:
+            resp = await client.get(f"{COLLECTOR_SERVICE_URL}/events", params=params)
             resp.raise_for_status()
-            events = resp.json() or []
-            sys_events = [e for e in events if str(e.get("event_type")) == "system_metrics"]
-            if not sys_events:
-                return {
-                    "available": False,
-                    "message": "No system metrics available",
-                }
-            # Pick the most recent by timestamp
-            latest = max(sys_events, key=lambda e: e.get("timestamp", ""))
-            data = latest.get("data", {}) or {}
-            summary = {
-                "node_id": latest.get("node_id"),
-                "timestamp": latest.get("timestamp"),
-                "uptime": data.get("uptime"),
-                "loadavg": data.get("loadavg"),
-                "disk": data.get("disk"),
-                "network": data.get("network"),
-                "os_kernel": data.get("os_kernel"),
-                # Trim large blobs for UI quick view
-                "cpu_mem": (data.get("cpu_mem") or "")[:800],
-                "processes_top": (data.get("processes_top") or "")[:800],
-                "users": data.get("users"),
+        except Exception:
+            resp = await client.get("http://127.0.0.1:8002/events", params=params)
+        resp.raise_for_status()
+        events = resp.json() or []
+        # Collector returns events newest-first, so the first match is the
+        # latest; selection stops there instead of scanning the whole list
+        latest = next((e for e in events if str(e.get("event_type")) == "system_metrics"), None)
+        if latest is None:
+            return {
+                "available": False,
+                "message": "No system metrics available",
             }
-            return {"available": True, "summary": summary}
+        data = latest.get("data", {}) or {}
+        summary = {
+            "node_id": latest.get("node_id"),
+            "timestamp": latest.get("timestamp"),
+            "uptime": data.get("uptime"),
+            "loadavg": data.get("loadavg"),
+            "disk": data.get("disk"),
+            "network": data.get("network"),
+            "os_kernel": data.get("os_kernel"),
+            # Trim large blobs for UI quick view
+            "cpu_mem": (data.get("cpu_mem") or "")[:800],
+            "processes_top": (data.get("processes_top") or "")[:800],
+            "users": data.get("users"),
+        }
+        return {"available": True, "summary": summary}
     except Exception as e:
         logger.error(f"Error fetching system metrics: {e}")
         return {"available": False, "message": "Failed to fetch system metrics"}
@@ -358,5 +385,17 @@ async def metrics():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    options = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "workers": int(os.getenv("WEB_CONCURRENCY", "4")),
+    }
+    # When collocated with a local proxy, a Unix domain socket skips the
+    # TCP/loopback stack entirely; callers then need an httpx transport
+    # with uds= pointing at the same path.
+    uds = os.getenv("UVICORN_UDS")
+    if uds:
+        uvicorn.run("app:app", uds=uds, **options)
+    else:
+        uvicorn.run("app:app", host="0.0.0.0", port=8000, **options)
 
@@ -1,33 +1,75 @@
 import logging
 import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 import httpx
+import orjson
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="notification-service", version="1.0.0")
-
 K8S_API = os.getenv("K8S_API", "https://kubernetes.default.svc")
 NAMESPACE = os.getenv("TARGET_NAMESPACE", "assettrack")
 DEPLOYMENT = os.getenv("TARGET_DEPLOYMENT", "processor")
 
+TOKEN_PATH = "/var/run/secrets/kubernetes.io/serviceaccount/token"
+CA_PATH = "/var/run/secrets/kubernetes.io/serviceaccount/ca.crt"
+
+# The service-account token is read once and cached; re-reading the file on
+# every alert is synchronous I/O inside an async handler. Tokens rotate, so
+# a lock-protected refresh re-reads on 401.
+_token_lock = threading.Lock()
+_token: Optional[str] = None
+
+def get_token(refresh: bool = False) -> Optional[str]:
+    global _token
+    if _token is not None and not refresh:
+        return _token
+    with _token_lock:
+        if _token is None or refresh:
+            try:
+                with open(TOKEN_PATH, "r") as f:
+                    _token = f.read().strip()
+            except Exception:
+                logger.warning("Could not read in-cluster token; scale call will likely fail")
+        return _token
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One client to the API server for the pod's lifetime; verify against
+    # the in-cluster CA when present
+    app.state.k8s = httpx.AsyncClient(
+        verify=CA_PATH if os.path.exists(CA_PATH) else False,
+        timeout=10.0,
+        http2=True,
+    )
+    get_token()
+    yield
+    await app.state.k8s.aclose()
+
+app = FastAPI(title="notification-service", version="1.0.0", lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 async def scale_deployment(namespace: str, name: str, replicas: int) -> None:
-    # Use in-cluster service account; no cert validation tweaks here for brevity
     url = f"{K8S_API}/apis/apps/v1/namespaces/{namespace}/deployments/{name}/scale"
-    async with httpx.AsyncClient(verify=False, timeout=10.0) as client:
-        payload = {"spec": {"replicas": replicas}}
-        headers = {"Content-Type": "application/json"}
-        # Rely on in-cluster auth token
-        try:
-            with open("/var/run/secrets/kubernetes.io/serviceaccount/token", "r") as f:
-                token = f.read().strip()
-                headers["Authorization"] = f"Bearer {token}"
-        except Exception:
-            logger.warning("Could not read in-cluster token; scale call will likely fail")
-        resp = await client.put(url, json=payload, headers=headers)
-        resp.raise_for_status()
+    body = orjson.dumps({"spec": {"replicas": replicas}})
+    headers = {"Content-Type": "application/json"}
+    token = get_token()
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    resp = await app.state.k8s.put(url, content=body, headers=headers)
+    if resp.status_code == 401:
+        # Token may have rotated; refresh once and retry
+        token = get_token(refresh=True)
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        resp = await app.state.k8s.put(url, content=body, headers=headers)
+    resp.raise_for_status()
 
 @app.post("/alert")
 async def receive_alert(request: Request):
@@ -45,4 +87,15 @@ async def receive_alert(request: Request):
         return JSONResponse({"status": "error", "error": str(e)}, status_code=500)
     return {"status": "ignored"}
 
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8088,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "2")),
+    )
+
 
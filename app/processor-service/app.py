@@ -1,16 +1,16 @@
 import logging
 import sys
 import os
-from fastapi import FastAPI, Request, Response, status
+import orjson
+from fastapi import FastAPI, Query, Request, Response, status
 from fastapi.responses import JSONResponse, PlainTextResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
-from uuid import uuid4
-from datetime import datetime
+from uuid import UUID, uuid4
+from datetime import datetime, timezone
+from decimal import Decimal
 import uvicorn
-import psycopg2
-from psycopg2.pool import SimpleConnectionPool
-from psycopg2.extras import RealDictCursor, Json
+import asyncpg
 
 # Configure logging
 logging.basicConfig(
@@ -22,31 +22,82 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _orjson_default(obj):
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj)}")
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson.
+
+    Serializing with orjson skips FastAPI's jsonable_encoder pass over
+    every row; OPT_UTC_Z/OPT_NAIVE_UTC emit datetimes as "...Z" strings
+    directly in C.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z,
+        )
+
 # Add middleware for request logging
 class LoggingMiddleware:
-    async def __call__(self, request: Request, call_next):
-        logger.info(f"Request: {request.method} {request.url}")
-        logger.info(f"Headers: {dict(request.headers)}")
-        
+    """Pure ASGI middleware. Registering through app.middleware('http')
+    routed every request through Starlette's BaseHTTPMiddleware, which
+    wraps each one in an extra task plus an anyio portal; speaking
+    scope/receive/send directly skips all of that."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Guarded, %s-style logging: nothing is formatted unless DEBUG is
+        # actually enabled, and /healthz probes are never logged
+        debug = logger.isEnabledFor(logging.DEBUG) and scope["path"] != "/healthz"
+        if debug:
+            logger.debug("req %s %s", scope["method"], scope["path"])
+
+        response_started = False
+
+        async def send_wrapped(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                if debug:
+                    logger.debug("res %s %s -> %d", scope["method"], scope["path"], message["status"])
+            await send(message)
+
         try:
-            response = await call_next(request)
-            logger.info(f"Response status: {response.status_code}")
-            return response
+            await self.app(scope, receive, send_wrapped)
         except Exception as e:
             logger.error(f"Error processing request: {str(e)}", exc_info=True)
-            return JSONResponse(
+            if response_started:
+                # Part of a response is already on the wire; a second
+                # http.response.start would crash in the server
+                raise
+            response = ORJSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={"detail": "Internal server error"}
             )
+            await response(scope, receive, send)
 
 app = FastAPI(
     title="processor-service",
     version="1.0.0",
-    debug=True
+    default_response_class=ORJSONResponse
 )
 
 # Add middleware
-app.middleware('http')(LoggingMiddleware())
+app.add_middleware(LoggingMiddleware)
 
 # Test endpoint for debugging
 @app.get("/test")
@@ -60,8 +111,10 @@ class Asset(BaseModel):
     type: str
     location: str
     status: str = "active"
-    last_updated: datetime = datetime.utcnow()
-    metadata: dict = {}
+    # default_factory: a bare datetime.utcnow() default is evaluated once
+    # at import, stamping every defaulted Asset with the same stale time
+    last_updated: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    metadata: Dict[str, Any] = Field(default_factory=dict)
 
 class AssetCreate(BaseModel):
     name: str
@@ -70,52 +123,122 @@ class AssetCreate(BaseModel):
     metadata: Optional[dict] = None
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
-db_pool: Optional[SimpleConnectionPool] = None
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "25"))
+# relaxed: commits return before the WAL fsync, trading the last few
+# seconds of writes on a crash for a much cheaper commit path -- an
+# acceptable deal for this asset registry when the operator opts in
+DB_DURABILITY = os.getenv("DB_DURABILITY", "full")
+db_pool: Optional[asyncpg.Pool] = None
+
+# Fixed SQL text for the hot CRUD queries; asyncpg prepares each distinct
+# statement once per connection and replays the cached plan afterwards,
+# skipping the parse/plan cost on every call
+SELECT_ALL_SQL = "SELECT id::text, name, type, location, status, last_updated, metadata FROM assets ORDER BY last_updated DESC, id DESC LIMIT $1"
+# Keyset pagination: resume strictly before the caller's cursor so the
+# BRIN index on last_updated serves an indexed top-k instead of a full
+# sort. id breaks ties -- last_updated is not unique (bulk inserts stamp
+# one timestamp on the whole batch), so a bare timestamp cursor would
+# skip the rest of a tied run and reorder ties between pages
+SELECT_PAGE_SQL = "SELECT id::text, name, type, location, status, last_updated, metadata FROM assets WHERE (last_updated, id) < ($1, $2) ORDER BY last_updated DESC, id DESC LIMIT $3"
+SELECT_ONE_SQL = "SELECT id::text, name, type, location, status, last_updated, metadata FROM assets WHERE id = $1"
+# One prepared statement covers every PUT: unset fields arrive as NULL and
+# COALESCE keeps the stored value, RETURNING hands back the updated row
+UPDATE_SQL = """
+    UPDATE assets SET
+        name = COALESCE($1, name),
+        type = COALESCE($2, type),
+        location = COALESCE($3, location),
+        status = COALESCE($4, status),
+        metadata = COALESCE($5, metadata),
+        last_updated = $6
+    WHERE id = $7
+    RETURNING id::text, name, type, location, status, last_updated, metadata
+"""
+INSERT_SQL = """
+    INSERT INTO assets (id, name, type, location, status, last_updated, metadata)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+"""
+DELETE_SQL = "DELETE FROM assets WHERE id = $1"
+# Counts computed in the database; one aggregate scan instead of shipping
+# every row to the caller just to len() it
+STATS_SQL = "SELECT count(*)::int AS total_assets, count(*) FILTER (WHERE status = 'active')::int AS active_assets FROM assets"
+READY_SQL = "SELECT 1"
+# asyncpg keys its per-connection prepared-statement cache on the exact
+# statement text, so DDL lives here too: one shared str object per
+# statement, nothing rebuilt per call
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS assets (
+        id UUID PRIMARY KEY,
+        name TEXT NOT NULL,
+        type TEXT NOT NULL,
+        location TEXT NOT NULL,
+        status TEXT NOT NULL,
+        last_updated TIMESTAMPTZ NOT NULL,
+        metadata JSONB NOT NULL DEFAULT '{}'::jsonb
+    )
+"""
+# BRIN is tiny and append-friendly, a good fit for a mostly
+# monotonically increasing last_updated column
+CREATE_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS assets_last_updated_brin_idx
+    ON assets USING BRIN (last_updated) WITH (pages_per_range = 32)
+"""
 
-def initialize_database_pool() -> None:
+# Constant response bodies serialized once at import; the 404 and delete
+# success payloads never change, so per-request orjson calls for them are
+# wasted work
+_NOT_FOUND_BODY = orjson.dumps({"detail": "Asset not found"})
+_DELETED_BODY = orjson.dumps({"message": "Asset deleted successfully"})
+
+def _not_found() -> Response:
+    return Response(content=_NOT_FOUND_BODY, status_code=404, media_type="application/json")
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    # metadata is JSONB; dict parameters are encoded with orjson, but the
+    # decoder deliberately leaves the stored JSON text untouched -- no
+    # handler inspects metadata, so _asset_row splices it straight into
+    # the response instead of round-tripping through a Python dict
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=lambda value: orjson.dumps(value).decode(),
+        decoder=lambda value: value,
+        schema="pg_catalog",
+    )
+    if DB_DURABILITY == "relaxed":
+        # Session-level setting: every commit on this pooled connection
+        # skips the synchronous WAL flush
+        await conn.execute("SET synchronous_commit TO off")
+
+def _asset_row(record) -> Dict[str, Any]:
+    """Build a response dict from an asset Record, keeping the raw JSONB
+    text of metadata as an orjson.Fragment so it is emitted verbatim."""
+    row = dict(record)
+    raw = row.get("metadata")
+    if isinstance(raw, (str, bytes)):
+        row["metadata"] = orjson.Fragment(raw)
+    return row
+
+async def initialize_database_pool() -> None:
     global db_pool
     if not DATABASE_URL:
         logger.warning("DATABASE_URL is not set. The processor will run without persistence.")
         return
     if db_pool is None:
-        db_pool = SimpleConnectionPool(
-            minconn=1,
-            maxconn=5,
+        db_pool = await asyncpg.create_pool(
             dsn=DATABASE_URL,
+            min_size=4,
+            max_size=DB_POOL_SIZE,
+            statement_cache_size=1024,
+            init=_init_connection,
         )
-        logger.info("Initialized PostgreSQL connection pool")
-
-def with_connection():
-    class _ConnCtx:
-        def __enter__(self):
-            if db_pool is None:
-                return None
-            self.conn = db_pool.getconn()
-            return self.conn
-
-        def __exit__(self, exc_type, exc, tb):
-            if db_pool is not None:
-                db_pool.putconn(self.conn)
-    return _ConnCtx()
-
-def ensure_schema() -> None:
+        logger.info("Initialized PostgreSQL connection pool (max %d connections)", DB_POOL_SIZE)
+
+async def ensure_schema() -> None:
     if db_pool is None:
         return
-    create_table_sql = """
-    CREATE TABLE IF NOT EXISTS assets (
-        id UUID PRIMARY KEY,
-        name TEXT NOT NULL,
-        type TEXT NOT NULL,
-        location TEXT NOT NULL,
-        status TEXT NOT NULL,
-        last_updated TIMESTAMPTZ NOT NULL,
-        metadata JSONB NOT NULL DEFAULT '{}'::jsonb
-    );
-    """
-    with with_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(create_table_sql)
-            conn.commit()
+    async with db_pool.acquire() as conn:
+        await conn.execute(CREATE_TABLE_SQL)
+        await conn.execute(CREATE_INDEX_SQL)
     logger.info("Ensured assets table exists")
 
 class AssetUpdate(BaseModel):
@@ -125,30 +248,35 @@ class AssetUpdate(BaseModel):
     status: Optional[str] = None
     metadata: Optional[dict] = None
 
-@app.get("/assets", response_model=List[Asset])
-async def list_assets(request: Request):
+@app.get("/assets", response_class=ORJSONResponse)
+async def list_assets(request: Request, limit: int = Query(100, ge=0, le=1000), cursor: Optional[str] = None):
+    """List assets newest-first. Pass the last row's last_updated and id
+    joined by "|" (e.g. "2024-01-01T00:00:00Z|<uuid>") as `cursor` to
+    fetch the next page."""
     logger.info(f"GET /assets called from {request.client.host}")
     if db_pool is None:
         # fallback to transient empty list when DB not configured
         logger.warning("DATABASE_URL not set, returning in-memory empty list")
         return []
-    with with_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("SELECT id::text, name, type, location, status, last_updated, metadata FROM assets ORDER BY last_updated DESC")
-            rows = cur.fetchall()
-            # Convert to standard dict list
-            return [
-                {
-                    **row,
-                    "last_updated": row["last_updated"].isoformat().replace("+00:00", "Z") if row.get("last_updated") else datetime.utcnow().isoformat() + "Z",
-                }
-                for row in rows
-            ]
-
-@app.post("/assets", response_model=Asset)
-def create_asset(asset: AssetCreate):
+    async with db_pool.acquire() as conn:
+        if cursor:
+            try:
+                ts_part, _, id_part = cursor.partition("|")
+                before = datetime.fromisoformat(ts_part.replace("Z", "+00:00"))
+                before_id = UUID(id_part)
+            except ValueError:
+                return ORJSONResponse(status_code=400, content={"detail": "Invalid cursor"})
+            rows = await conn.fetch(SELECT_PAGE_SQL, before, before_id, limit)
+        else:
+            rows = await conn.fetch(SELECT_ALL_SQL, limit)
+    # orjson emits last_updated as "...Z" in C (OPT_UTC_Z), so no
+    # per-row Python isoformat/replace pass is needed
+    return ORJSONResponse([_asset_row(row) for row in rows])
+
+@app.post("/assets")
+async def create_asset(asset: AssetCreate):
     asset_id = str(uuid4())
-    asset_data = asset.dict()
+    asset_data = asset.model_dump()
     if asset_data.get('metadata') is None:
         asset_data['metadata'] = {}
     now = datetime.utcnow()
@@ -156,113 +284,147 @@ def create_asset(asset: AssetCreate):
         # transient non-persistent fallback
         created = Asset(id=asset_id, last_updated=now, status="active", **asset_data)
         logger.info("Created asset without persistence (no DATABASE_URL)")
-        return created
-    with with_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO assets (id, name, type, location, status, last_updated, metadata)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-                """,
-                (
-                    asset_id,
-                    asset_data["name"],
-                    asset_data["type"],
-                    asset_data["location"],
-                    "active",
-                    now,
-                    Json(asset_data["metadata"]),
-                ),
-            )
-            conn.commit()
+        return Response(content=created.model_dump_json(), media_type="application/json")
+    async with db_pool.acquire() as conn:
+        await conn.execute(
+            INSERT_SQL,
+            asset_id,
+            asset_data["name"],
+            asset_data["type"],
+            asset_data["location"],
+            "active",
+            now,
+            asset_data["metadata"],
+        )
     created = Asset(id=asset_id, last_updated=now, status="active", **asset_data)
     logger.info(f"Created new asset: {created}")
-    return created
+    # model_dump_json serializes in Rust; no jsonable_encoder or second
+    # validation pass through a response_model
+    return Response(content=created.model_dump_json(), media_type="application/json")
+
+@app.post("/assets/bulk", response_class=ORJSONResponse)
+async def create_assets_bulk(assets: List[AssetCreate]):
+    """Create many assets in one request.
 
-@app.get("/assets/{asset_id}", response_model=Asset)
-def get_asset(asset_id: str):
+    executemany sends the whole batch through the prepared INSERT in a
+    single pipelined exchange, amortizing protocol overhead that a POST
+    per row would pay N times.
+    """
+    now = datetime.utcnow()
+    rows = []
+    created = []
+    for asset in assets:
+        asset_data = asset.model_dump()
+        if asset_data.get('metadata') is None:
+            asset_data['metadata'] = {}
+        asset_id = str(uuid4())
+        rows.append((
+            asset_id,
+            asset_data["name"],
+            asset_data["type"],
+            asset_data["location"],
+            "active",
+            now,
+            asset_data["metadata"],
+        ))
+        created.append(Asset(id=asset_id, last_updated=now, status="active", **asset_data))
+    if db_pool is None:
+        logger.info("Created %d assets without persistence (no DATABASE_URL)", len(created))
+        return ORJSONResponse([a.model_dump() for a in created])
+    if rows:
+        async with db_pool.acquire() as conn:
+            # executemany pipelines the whole batch over one exchange and
+            # runs it atomically in an implicit transaction, so an explicit
+            # BEGIN/COMMIT pair would only add two more roundtrips
+            await conn.executemany(INSERT_SQL, rows)
+    logger.info("Created %d assets in bulk", len(created))
+    return ORJSONResponse([a.model_dump() for a in created])
+
+@app.get("/assets/{asset_id}", response_class=ORJSONResponse)
+async def get_asset(asset_id: str):
     if db_pool is None:
         logger.warning("DATABASE_URL not set; cannot retrieve specific asset")
-        return JSONResponse(status_code=404, content={"detail": "Asset not found"})
-    with with_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                "SELECT id::text, name, type, location, status, last_updated, metadata FROM assets WHERE id = %s",
-                (asset_id,),
-            )
-            row = cur.fetchone()
-            if not row:
-                logger.warning(f"Asset not found: {asset_id}")
-                return JSONResponse(status_code=404, content={"detail": "Asset not found"})
-            row["last_updated"] = row["last_updated"].isoformat().replace("+00:00", "Z") if row.get("last_updated") else datetime.utcnow().isoformat() + "Z"
-            return row
-
-@app.put("/assets/{asset_id}", response_model=Asset)
-def update_asset(asset_id: str, update: AssetUpdate):
+        return _not_found()
+    async with db_pool.acquire() as conn:
+        record = await conn.fetchrow(SELECT_ONE_SQL, asset_id)
+    if record is None:
+        logger.warning(f"Asset not found: {asset_id}")
+        return _not_found()
+    # last_updated is NOT NULL; orjson renders it as "...Z" directly
+    return ORJSONResponse(_asset_row(record))
+
+@app.put("/assets/{asset_id}", response_class=ORJSONResponse)
+async def update_asset(asset_id: str, update: AssetUpdate):
     logger.info(f"PUT /assets/{asset_id} called")
-    update_data = update.dict(exclude_unset=True)
+    update_data = update.model_dump(exclude_unset=True)
     now = datetime.utcnow()
     if db_pool is None:
         logger.warning("DATABASE_URL not set; cannot update asset")
-        return JSONResponse(status_code=404, content={"detail": "Asset not found"})
-    with with_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Ensure asset exists
-            cur.execute("SELECT 1 FROM assets WHERE id = %s", (asset_id,))
-            if cur.fetchone() is None:
-                logger.warning(f"Asset not found: {asset_id}")
-                return JSONResponse(status_code=404, content={"detail": "Asset not found"})
-            # Build dynamic update
-            sets = []
-            values = []
-            for field in ["name", "type", "location", "status", "metadata"]:
-                if field in update_data and update_data[field] is not None:
-                    sets.append(f"{field} = %s")
-                    values.append(Json(update_data[field]) if field == "metadata" else update_data[field])
-            sets.append("last_updated = %s")
-            values.append(now)
-            values.append(asset_id)
-            sql = f"UPDATE assets SET {', '.join(sets)} WHERE id = %s"
-            cur.execute(sql, tuple(values))
-            conn.commit()
-            # Return updated row
-            cur.execute(
-                "SELECT id::text, name, type, location, status, last_updated, metadata FROM assets WHERE id = %s",
-                (asset_id,),
-            )
-            row = cur.fetchone()
-            row["last_updated"] = row["last_updated"].isoformat().replace("+00:00", "Z") if row.get("last_updated") else now.isoformat() + "Z"
-            logger.info(f"Asset updated: {asset_id}")
-            return row
+        return _not_found()
+    async with db_pool.acquire() as conn:
+        # Single roundtrip: update and fetch the resulting row together;
+        # a missing id simply returns no row
+        record = await conn.fetchrow(
+            UPDATE_SQL,
+            update_data.get("name"),
+            update_data.get("type"),
+            update_data.get("location"),
+            update_data.get("status"),
+            update_data.get("metadata"),
+            now,
+            asset_id,
+        )
+    if record is None:
+        logger.warning(f"Asset not found: {asset_id}")
+        return _not_found()
+    logger.info(f"Asset updated: {asset_id}")
+    # last_updated is NOT NULL; orjson renders it as "...Z" directly
+    return ORJSONResponse(_asset_row(record))
 
 @app.delete("/assets/{asset_id}")
-def delete_asset(asset_id: str):
+async def delete_asset(asset_id: str):
     logger.info(f"DELETE /assets/{asset_id} called")
     if db_pool is None:
         logger.warning("DATABASE_URL not set; cannot delete asset")
-        return JSONResponse(status_code=404, content={"detail": "Asset not found"})
-    with with_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("DELETE FROM assets WHERE id = %s", (asset_id,))
-            if cur.rowcount == 0:
-                logger.warning(f"Asset not found: {asset_id}")
-                return JSONResponse(status_code=404, content={"detail": "Asset not found"})
-            conn.commit()
+        return _not_found()
+    async with db_pool.acquire() as conn:
+        result = await conn.execute(DELETE_SQL, asset_id)
+    if result == "DELETE 0":
+        logger.warning(f"Asset not found: {asset_id}")
+        return _not_found()
     logger.info(f"Asset deleted: {asset_id}")
-    return {"message": "Asset deleted successfully"}
+    return Response(content=_DELETED_BODY, media_type="application/json")
+
+# Liveness body built once; kubelet probes hit this every few seconds and
+# should cost neither a DB roundtrip nor a log line
+_HEALTHZ_RESPONSE = PlainTextResponse(b"ok")
 
-@app.get("/healthz", response_class=PlainTextResponse)
+@app.get("/stats")
+async def asset_stats():
+    """Total and active asset counts, aggregated server-side."""
+    if db_pool is None:
+        return {"total_assets": 0, "active_assets": 0}
+    async with db_pool.acquire() as conn:
+        record = await conn.fetchrow(STATS_SQL)
+    return dict(record)
+
+@app.get("/healthz")
 async def healthz():
-    logger.info("Health check called")
+    return _HEALTHZ_RESPONSE
+
+@app.get("/readyz", response_class=PlainTextResponse)
+async def readyz():
+    """Readiness: one cheap SELECT 1 with a tight timeout. Pool and schema
+    setup happen in on_startup, never here."""
+    if db_pool is None:
+        # No database configured; the service is serving its fallbacks
+        return "ok"
     try:
-        # Test database connection if configured
-        if DATABASE_URL:
-            initialize_database_pool()
-            ensure_schema()
+        async with db_pool.acquire() as conn:
+            await conn.fetchval(READY_SQL, timeout=0.1)
         return "ok"
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
+        logger.error(f"Readiness check failed: {str(e)}")
         return Response(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             content="service unavailable"
@@ -272,18 +434,27 @@ async def healthz():
 async def on_startup():
     try:
         if DATABASE_URL:
-            initialize_database_pool()
-            ensure_schema()
+            await initialize_database_pool()
+            await ensure_schema()
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    if db_pool is not None:
+        await db_pool.close()
+
 if __name__ == "__main__":
-    import uvicorn
     logger.info("Starting processor service...")
     uvicorn.run(
         "app:app",
         host="0.0.0.0",
         port=8000,
-        log_level="debug",
-        reload=True
+        workers=int(os.getenv("WEB_CONCURRENCY", "4")),
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+        access_log=False,
+        limit_concurrency=1000,
+        timeout_keep_alive=30,
     )
\ No newline at end of file